@@ -0,0 +1,22 @@
+# Frozen-module manifest for building custom RP2 firmware (see `make firmware`). Frozen modules are compiled at firmware
+# build time and their bytecode runs straight out of flash, so none of it takes up heap at boot.
+#
+# main.py is left out on purpose, it is only ever run from the filesystem.
+include("$(PORT_DIR)/boards/manifest.py")
+
+freeze(
+    "src",
+    (
+        "channel_maps.py",
+        "config.py",
+        "leds.py",
+        "temperature.py",
+        "peripherals/__init__.py",
+        "peripherals/ads1115.py",
+        "peripherals/dht20.py",
+        "peripherals/ina3221.py",
+        "peripherals/picoled.py",
+        "peripherals/ws2812.py",
+    ),
+    opt=3,
+)
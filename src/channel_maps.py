@@ -0,0 +1,41 @@
+"""
+channel_maps.py
+
+Static LED channel layout for Amethyst. The numeric maps are `bytes` literals (and the RGBW table an int bitmask)
+rather than tuples, so they live in the bytecode instead of being rebuilt on the heap on import.
+
+Copyright (C) 2022 Nick Whalen (purplxed@projectneutron.com)
+"""
+from micropython import const
+
+# Lian Li AF120/Infinity
+# These are in sequence order, edges start at the power connector and move clockwise when looking at the side of the
+# fan with the hub supports
+# Hub - 8 LEDs
+# Top Right - 3
+# Top Left - 3
+# Bottom Left - 3
+# Bottom Right - 3
+# 20 Total LEDs
+
+CHANNEL_NAMES = (
+    "Top Left",                 # 0
+    "Top Fans",                 # 1
+    "Top Right",                # 2
+    "Back Left",                # 3
+    "Front Left",               # 4
+    "Front Right",              # 5
+    "Panel Strip",              # 6
+    "Side Fans",                # 7
+    "Bottom Fans",              # 8
+    "Bottom Left",              # 9
+    "Bottom Back and Right",    # 10
+    "Bottom Front"              # 11
+)
+
+# GPIO pin for each channel: 2, 17, 21, 1, 20, 0, 19, 18, 16, 3, 4, 5
+CHANNEL_PIN_MAP = b"\x02\x11\x15\x01\x14\x00\x13\x12\x10\x03\x04\x05"
+# Bit N is set if channel N has RGBW LEDs (channels 0, 2, 3, 4, 5, 9, 10, 11)
+CHANNEL_RGBW_MASK = const(0b111000111101)
+# LED count for each channel: 59, 60, 58, 65, 65, 65, 28, 60, 60, 62, 93, 25
+CHANNEL_LED_COUNTS = b"\x3b\x3c\x3a\x41\x41\x41\x1c\x3c\x3c\x3e\x5d\x19"
@@ -5,18 +5,23 @@ Configuration utilities for lighting controller
 
 Copyright (C) 2022 Nick Whalen (purplxed@projectneutron.com)
 """
+import micropython
 import os
 import struct
-import sys
 from array import array
+from binascii import crc32
 from gc import collect
 from micropython import const
-from uio import FileIO
 
 STR_ENCODING="utf-8"
 CONFIG_ROOT="/lighting"
 CONFIG_HEADER=bytes((0x92, 0x00, 0x00))
 CONFIG_FOOTER=bytes((0x00, 0x00, 0x42))
+CONFIG_SNAPSHOT_SUFFIX=".parsed"
+# Config version, freq, then the lengths of: name, the fused PWM tables, pwmNames, inaSettings, i2cSettings, adsSettings,
+# then the size and mtime of the config file the snapshot was made from
+SNAPSHOT_HEADER_FMT="<BI6BII"
+SNAPSHOT_HEADER_SIZE=struct.calcsize(SNAPSHOT_HEADER_FMT)
 
 PWM_CH0 = const(0)
 PWM_CH1 = const(1)
@@ -35,7 +40,7 @@ ADC_CH1 = const(1)
 ADC_CH2 = const(2)
 ADC_CH3 = const(3)
 
-ENVELOPE_CONFIG_VER = 2
+ENVELOPE_CONFIG_VER = 3
 
 class ConfigError(Exception): pass
 
@@ -50,11 +55,21 @@ class EnvelopeConfig:
         self.freq: int = 133_000_000
         # Sane defaults based on Amethyst
         self.config_file = f"{CONFIG_ROOT}/{config_file_name}"
-        self.pwmMap: bytearray = bytearray((0, 2, 4, 6, 8, 10))
-        self.tachMap: bytearray = bytearray((1, 3, 5, 7, 9, 11))
+        self.snapshot_file = f"{self.config_file}{CONFIG_SNAPSHOT_SUFFIX}"
+        self._last_crc: int or None = None   # CRC32 of the config file contents as last loaded/saved
+        # pwmMap, tachMap and pwmDutyCycles are always indexed by the same channel, so they share a single buffer
+        # (one allocation, saved/loaded as one block) and are exposed as views into it
+        self._pwm_soa: bytearray = bytearray((
+            0, 2, 4, 6, 8, 10,                  # pwmMap
+            1, 3, 5, 7, 9, 11,                  # tachMap
+            100, 100, 100, 100, 100, 100,       # pwmDutyCycles
+        ))
+        pwm_soa = memoryview(self._pwm_soa)
+        self.pwmMap: memoryview = pwm_soa[0:self.numPwmChannels]
+        self.tachMap: memoryview = pwm_soa[self.numPwmChannels:self.numPwmChannels*2]
         self.pwmNames: list = ["FAN 1", "FAN 2", "FAN 3", "FAN 4", "Pump", "Spare"]
 
-        self.pwmDutyCycles: bytearray = bytearray((100, 100, 100, 100, 100, 100))
+        self.pwmDutyCycles: memoryview = pwm_soa[self.numPwmChannels*2:]
 
         # I2C Bus Settings
         # i2c bus, i2c scl pin, i2c sda pin, i2c frequency
@@ -74,28 +89,75 @@ class EnvelopeConfig:
         except OSError:
             os.mkdir(CONFIG_ROOT)
 
-    def _read_bytearray(self, file: FileIO) -> bytearray:
-        size = int.from_bytes(file.read(1), sys.byteorder)
-        return bytearray(file.read(size))
+    def _read_bytearray(self, buf: memoryview, off: int) -> tuple:
+        """
+        Reads a bytearray with a 1 byte length prefix out of the config buffer
+
+        :param buf: Config file contents
+        :param off: Offset of the length prefix
+        :return: (bytearray, offset of the next field)
+        """
+        size = buf[off]
+        off += 1
+        return bytearray(buf[off:off+size]), off+size
+
+    def _read_pwm_soa(self, buf: memoryview, off: int) -> int:
+        """
+        Reads the fused pwmMap/tachMap/pwmDutyCycles block (1 byte length prefix) straight into `_pwm_soa`
+
+        :param buf: Config file contents
+        :param off: Offset of the length prefix
+        :return: Offset of the next field
+        """
+        size = buf[off]
+        if size != len(self._pwm_soa):
+            raise ConfigError(f"PWM tables are {size} bytes, expected {len(self._pwm_soa)}")
+        off += 1
+        self._pwm_soa[:] = buf[off:off+size]
+        return off+size
+
+    def _read_str_list(self, buf: memoryview, off: int) -> tuple:
+        """
+        Reads a list of strings (1 byte element count, then length-prefixed strings) out of the config buffer
 
-    def _read_str_list(self, file: FileIO) -> list:
-        num_elements = int.from_bytes(file.read(1), sys.byteorder)
-        elements = (file.read(int.from_bytes(file.read(1), sys.byteorder)).decode(STR_ENCODING)
-                    for _ in range(0, num_elements))
-        return list(elements)
+        :param buf: Config file contents
+        :param off: Offset of the element count
+        :return: (list, offset of the next field)
+        """
+        num_elements = buf[off]
+        off += 1
+        elements = []
+        for _ in range(0, num_elements):
+            element, off = self._read_str(buf, off)
+            elements.append(element)
+        return elements, off
+
+    def _read_str(self, buf: memoryview, off: int) -> tuple:
+        """
+        Reads a str with a 1 byte length prefix out of the config buffer
 
-    def _read_str(self, file: FileIO) -> str:
-        str_len = int.from_bytes(file.read(1), sys.byteorder)
-        return file.read(str_len).decode(STR_ENCODING)
+        :param buf: Config file contents
+        :param off: Offset of the length prefix
+        :return: (str, offset of the next field)
+        """
+        str_len = buf[off]
+        off += 1
+        return bytes(buf[off:off+str_len]).decode(STR_ENCODING), off+str_len
 
-    def _read_array(self, file: FileIO) -> array:
-        array_len = int.from_bytes(file.read(2), sys.byteorder)
-        arr = array(file.read(1).decode(STR_ENCODING))
+    def _read_array(self, buf: memoryview, off: int) -> tuple:
+        """
+        Reads an array (2 byte element count, 1 byte typecode, 4 byte elements) out of the config buffer
 
-        for i in range(0, array_len):
-            arr.append(int.from_bytes(file.read(4), sys.byteorder))
+        :param buf: Config file contents
+        :param off: Offset of the element count
+        :return: (array, offset of the next field)
+        """
+        array_len = struct.unpack_from("<H", buf, off)[0]
+        off += 3
+        # MicroPython builds the array straight from the raw bytes
+        arr = array(chr(buf[off-1]), bytes(buf[off:off+(array_len*4)]))
 
-        return arr
+        return arr, off+(array_len*4)
 
     def getInaCfgItem(self, item: int) -> int:
         """
@@ -106,39 +168,164 @@ class EnvelopeConfig:
         """
         return self.inaSettings[item]
 
+    def _readFile(self, path: str) -> bytearray:
+        """
+        Reads a whole file into a buffer sized from `os.stat`, with a single `readinto` call
+
+        :param path: File to read
+        :return: The file contents
+        """
+        buf = bytearray(os.stat(path)[6])
+        with open(path, "rb") as file:
+            file.readinto(buf)
+
+        return buf
+
+    def _configStamp(self) -> tuple:
+        """
+        Identifies the current version of the config file, so a snapshot made from an older one (e.g. the file was
+        replaced over USB) isn't used
+
+        :return: Size and mtime of the config file
+        """
+        stat = os.stat(self.config_file)
+        return stat[6], stat[8]
+
+    def _fromSnapshot(self) -> bool:
+        """
+        Loads the configuration from the snapshot written by `_toSnapshot`
+
+        :return: `True` if the snapshot was loaded, `False` if it is missing, corrupt, from another config version, or
+                 the config file has changed since it was written
+        """
+        try:
+            stamp = self._configStamp()
+            raw = self._readFile(self.snapshot_file)
+        except OSError:
+            return False
+
+        buf = memoryview(raw)
+        crc_off = len(raw) - 4
+        if crc_off < SNAPSHOT_HEADER_SIZE or struct.unpack_from("<I", buf, crc_off)[0] != crc32(buf[:crc_off]):
+            return False
+
+        (version, freq, name_len, pwm_len, names_len, ina_len, i2c_len, ads_len, cfg_size, cfg_mtime) = \
+            struct.unpack_from(SNAPSHOT_HEADER_FMT, buf, 0)
+        if version != ENVELOPE_CONFIG_VER or pwm_len != len(self._pwm_soa) or (cfg_size, cfg_mtime) != stamp:
+            return False
+
+        self.cfg_version = version
+        self.freq = freq
+        off = SNAPSHOT_HEADER_SIZE
+        self.name = bytes(buf[off:off+name_len]).decode(STR_ENCODING)
+        off += name_len
+        self._pwm_soa[:] = buf[off:off+pwm_len]
+        off += pwm_len
+        names_off = off + names_len
+        self.pwmNames = []
+        for idx in range(off, off+names_len):
+            self.pwmNames.append(bytes(buf[names_off:names_off+raw[idx]]).decode(STR_ENCODING))
+            names_off += raw[idx]
+        off = names_off
+        self.inaSettings = bytearray(buf[off:off+ina_len])
+        off += ina_len
+        self.i2cSettings = array("L", bytes(buf[off:off+(i2c_len*4)]))
+        off += i2c_len*4
+        self.adsSettings = bytearray(buf[off:off+ads_len])
+
+        return True
+
+    def _toSnapshot(self, stamp: tuple):
+        """
+        Saves the parsed configuration next to the config file as a flat image of the fields: a fixed header
+        (`SNAPSHOT_HEADER_FMT`), the raw field buffers back to back, then a CRC32 of everything before it.
+
+        :param stamp: `_configStamp()` of the config file the fields were parsed from
+        """
+        name = self.name.encode(STR_ENCODING)
+        names = [element.encode(STR_ENCODING) for element in self.pwmNames]
+        fields = [
+            struct.pack(SNAPSHOT_HEADER_FMT, ENVELOPE_CONFIG_VER, self.freq, len(name), len(self._pwm_soa),
+                        len(names), len(self.inaSettings), len(self.i2cSettings), len(self.adsSettings), stamp[0], stamp[1]),
+            name,
+            self._pwm_soa,
+            bytes(len(element) for element in names),
+        ]
+        fields += names
+        fields += (self.inaSettings, bytes(self.i2cSettings), self.adsSettings)
+
+        snapshot = self._concat(fields, 4)
+        off = len(snapshot) - 4
+        struct.pack_into("<I", snapshot, off, crc32(memoryview(snapshot)[:off]))
+
+        with open(f"{self.snapshot_file}.new", "wb") as snap_file:
+            snap_file.write(snapshot)
+        try:
+            os.remove(self.snapshot_file)
+        except OSError:
+            pass
+        os.rename(f"{self.snapshot_file}.new", self.snapshot_file)
+
     def fromFlash(self):
         """
-        Loads the configuration from flash
+        Loads the configuration from flash. The snapshot of the last parse is used when it is valid, otherwise the
+        config file is parsed and a new snapshot is written.
 
         :return:
         """
+        if self._fromSnapshot():
+            return
+
         try:
-            with open(self.config_file, "rb") as cfg_file:
-                header = cfg_file.read(4)
-                if header[0:2] != CONFIG_HEADER[0:2]:
-                    raise ConfigError(f"Bad config header: {header[0]:#x} {header[1]:#x} {header[2]:#x}")
-                self.cfg_version = header[3]
-                if self.cfg_version != ENVELOPE_CONFIG_VER:
-                    raise ConfigError(f"Config file version does not match ENVELOPE_CONFIG_VER ({self.cfg_version}, {ENVELOPE_CONFIG_VER})")
-                self.freq = int.from_bytes(cfg_file.read(4), sys.byteorder)
-                self.name = self._read_str(cfg_file)
-                self.pwmMap = self._read_bytearray(cfg_file)
-                self.tachMap = self._read_bytearray(cfg_file)
-                self.pwmDutyCycles = self._read_bytearray(cfg_file)
-                self.pwmNames = self._read_str_list(cfg_file)
-                self.inaSettings = self._read_bytearray(cfg_file)
-                self.i2cSettings = self._read_array(cfg_file)
-                self.adsSettings = self._read_bytearray(cfg_file)
-                footer = cfg_file.read(3)
-
-                if footer != CONFIG_FOOTER:
-                    raise ConfigError(f"Bad config footer: {footer.decode(STR_ENCODING)} \
-                                        Expected: {CONFIG_FOOTER[0]:#x} {CONFIG_FOOTER[1]:#x} {CONFIG_FOOTER[2]:#x}")
+            stamp = self._configStamp()
+            raw = self._readFile(self.config_file)
         except OSError:
-            pass
+            return
+
+        # The whole file is walked in memory, rather than issuing a read() per field
+        buf = memoryview(raw)
+        self._last_crc = crc32(raw)
+        if raw[0] != CONFIG_HEADER[0] or raw[1] != CONFIG_HEADER[1]:
+            raise ConfigError(f"Bad config header: {raw[0]:#x} {raw[1]:#x} {raw[2]:#x}")
+        self.cfg_version = raw[3]
+        if self.cfg_version != ENVELOPE_CONFIG_VER:
+            raise ConfigError(f"Config file version does not match ENVELOPE_CONFIG_VER ({self.cfg_version}, {ENVELOPE_CONFIG_VER})")
+        self.freq = struct.unpack_from("<I", buf, 4)[0]
+        self.name, off = self._read_str(buf, 8)
+        off = self._read_pwm_soa(buf, off)
+        self.pwmNames, off = self._read_str_list(buf, off)
+        self.inaSettings, off = self._read_bytearray(buf, off)
+        self.i2cSettings, off = self._read_array(buf, off)
+        self.adsSettings, off = self._read_bytearray(buf, off)
+        footer = raw[off:off+3]
+
+        if footer != CONFIG_FOOTER:
+            raise ConfigError(f"Bad config footer: {footer} \
+                                Expected: {CONFIG_FOOTER[0]:#x} {CONFIG_FOOTER[1]:#x} {CONFIG_FOOTER[2]:#x}")
+
+        try:
+            self._toSnapshot(stamp)
+        except OSError:
+            pass  # The snapshot is only a cache, the config file has already been loaded
 
 
 
+    def _concat(self, fields, reserve: int = 0) -> bytearray:
+        """
+        Joins byte buffers into a single bytearray, allocated once at its final size
+
+        :param fields: The buffers to join
+        :param reserve: Number of extra (zeroed) bytes to leave at the end
+        :return:
+        """
+        ret = bytearray(sum(len(field) for field in fields) + reserve)
+        off = 0
+        for field in fields:
+            ret[off:off+len(field)] = field
+            off += len(field)
+
+        return ret
+
     def _savable_bytearray(self, data: bytearray) -> bytearray:
         """
         Returns a bytearray with its length (1 byte) prepended
@@ -146,7 +333,11 @@ class EnvelopeConfig:
         :param data:
         :return:
         """
-        return bytearray(len(data).to_bytes(1, sys.byteorder) + data)
+        ret = bytearray(1 + len(data))
+        ret[0] = len(data)
+        ret[1:] = data
+
+        return ret
 
     def _savable_str(self, data: str) -> bytearray:
         """
@@ -159,30 +350,35 @@ class EnvelopeConfig:
 
         return ret
 
+    @micropython.native
     def _savable_str_list(self, data: list) -> bytearray:
         """
-        Takes a tuple of strings and converts it to a savable byteaarray
+        Takes a list of strings and converts it to a savable bytearray
         :param data:
         :return:
         """
-        ret = bytearray((len(data),))
-        for element in data:
-            ret += bytes((len(element),))
-            ret += element.encode(STR_ENCODING)
+        encoded = [element.encode(STR_ENCODING) for element in data]
+        ret = bytearray(1 + sum(1 + len(element) for element in encoded))
+        ret[0] = len(encoded)
+
+        off = 1
+        for element in encoded:
+            ret[off] = len(element)
+            ret[off+1:off+1+len(element)] = element
+            off += 1 + len(element)
 
         return ret
 
     def _savable_array(self, data: array) -> bytearray:
         """
-        Takes a tuple of strings and converts it to a savable byteaarray
+        Takes an array of unsigned longs and converts it to a savable bytearray
         :param data:
         :return:
         """
-        ret = bytearray(len(data).to_bytes(2, sys.byteorder))
-        ret += "L"[0].encode(STR_ENCODING)
-
-        for element in data:
-            ret += struct.pack("L", element)
+        ret = bytearray(3 + 4*len(data))
+        struct.pack_into("<H", ret, 0, len(data))
+        ret[2] = ord("L")
+        ret[3:] = bytes(data)   # The array's buffer already holds the little-endian longs
 
         return ret
 
@@ -192,25 +388,44 @@ class EnvelopeConfig:
 
         :return:
         """
+        cfg = self._concat((
+            CONFIG_HEADER,
+            bytes((ENVELOPE_CONFIG_VER,)),
+            struct.pack("<I", self.freq),
+            self._savable_str(self.name),
+            self._savable_bytearray(self._pwm_soa),
+            self._savable_str_list(self.pwmNames),
+            self._savable_bytearray(self.inaSettings),
+            self._savable_array(self.i2cSettings),
+            self._savable_bytearray(self.adsSettings),
+            CONFIG_FOOTER,
+        ))
+        cfg_crc = crc32(cfg)
+
+        if self._last_crc is None:
+            try:
+                self._last_crc = crc32(self._readFile(self.config_file))
+            except OSError:
+                pass
+        # Nothing changed, so don't wear the flash rewriting the same bytes
+        if cfg_crc == self._last_crc:
+            return
+
+        # The snapshot would shadow the new config file on the next boot
+        try:
+            os.remove(self.snapshot_file)
+        except OSError:
+            pass
+
         with open(f"{self.config_file}.new", "wb") as cfg_file:
-            cfg_file.write(CONFIG_HEADER)
-            cfg_file.write(ENVELOPE_CONFIG_VER.to_bytes(1, sys.byteorder))
-            cfg_file.write(self.freq.to_bytes(4, sys.byteorder))
-            cfg_file.write(self._savable_str(self.name))
-            cfg_file.write(self._savable_bytearray(self.pwmMap))
-            cfg_file.write(self._savable_bytearray(self.tachMap))
-            cfg_file.write(self._savable_bytearray(self.pwmDutyCycles))
-            cfg_file.write(self._savable_str_list(self.pwmNames))
-            cfg_file.write(self._savable_bytearray(self.inaSettings))
-            cfg_file.write(self._savable_array(self.i2cSettings))
-            cfg_file.write(self._savable_bytearray(self.adsSettings))
-            cfg_file.write(CONFIG_FOOTER)
+            cfg_file.write(cfg)
 
         try:
             os.rename(self.config_file, f"{self.config_file}.old")
         except OSError:
             pass
         os.rename(f"{self.config_file}.new", self.config_file)
+        self._last_crc = cfg_crc
 
         # Manually run the garbage collector since we just did a lot of things, and it's expected this call will be slow
         # anyway
@@ -5,11 +5,14 @@ LED control (SK6812 and WS2812) for the Pico.
 
 Copyright (C) 2022 Nick Whalen (purplxed@projectneutron.com)
 """
+import micropython
 from gc import collect
 from machine import Pin, Timer
 from micropython import const, schedule
 from neopixel import NeoPixel
+from channel_maps import CHANNEL_PIN_MAP, CHANNEL_RGBW_MASK, CHANNEL_LED_COUNTS
 from peripherals.ina3221 import INA3221
+from peripherals.ws2812 import PioNeoPixel, PIO_STATE_MACHINE_COUNT
 
 DEFAULT_CHANNEL_LED_COUNT = const(100)
 DEFAULT_RGB_COLOR = (128, 0, 128)
@@ -17,27 +20,25 @@ DEFAULT_RGBW_COLOR = (0, 0, 64, 96)
 RGB_BPP = const(3)
 RGBW_BPP = const(4)
 POWER_TRIGGER_VOLTAGE = const(3)    # If the LED bus voltage is above this value, the main PSU is on
+POWER_LOST_VOLTAGE = 2.5    # Lower power-valid limit when the current monitor's PV pin is used, gives some hysteresis
 POWER_TRIGGER_CHANNEL = const(0)
-CHANNEL_PIN_MAP = (2, 17, 21, 1, 20, 0, 19, 18, 16, 3, 4, 5)
-CHANNEL_RGBW_LEDS = (True, False, True, True, True, True, False, False, False, True, True, True)
-CHANNEL_LED_COUNTS = (59, 60, 58, 65, 65, 65, 28, 60, 60, 62, 93, 25)
 
 class LedControl:
     def __init__(self,
                  current_monitor: INA3221,
-                 pins: tuple = CHANNEL_PIN_MAP,
-                 pin_rgbw_truth: tuple = CHANNEL_RGBW_LEDS,
-                 pin_led_counts: tuple = CHANNEL_LED_COUNTS,
+                 pins: bytes = CHANNEL_PIN_MAP,
+                 pin_rgbw_mask: int = CHANNEL_RGBW_MASK,
+                 pin_led_counts: bytes = CHANNEL_LED_COUNTS,
                  pin_names: tuple = None,
                  rgb_color: tuple = DEFAULT_RGB_COLOR,
                  rgbw_color: tuple = DEFAULT_RGBW_COLOR,
                  initialize_to_on: bool = False,
-                 restore_state_on_main_power: bool = True):
+                 restore_state_on_main_power: bool = True,
+                 power_alert_pin: int = None):
         """
         :param current_monitor: Reference to an initialized instance of the current monitor library
-        :param pins: Tuple of GPIO pins to use for RGB(W) control
-        :param pin_rgbw_truth: Truth table for RGBW, `True` if the corresponding slot in `pins` has RGBW LEDs, `False`
-                               otherwise
+        :param pins: GPIO pins to use for RGB(W) control
+        :param pin_rgbw_mask: Bitmask for RGBW, bit N is set if slot N in `pins` has RGBW LEDs
         :param pin_led_counts: Number of LEDs for each `pins` slot
         :param pin_names: The names to use for each pin (will end up as the channel names)
         :param rgb_color: The default color to initialize RGB strings to
@@ -45,23 +46,38 @@ class LedControl:
         :param initialize_to_on: If `True` then the LEDs will be set to their default values during initialization
         :param restore_state_on_main_power: Monitors the main power by means of the LED current monitor bus voltage and
                                             if it switches from off to on, restore the last state of the LEDs
+        :param power_alert_pin: GPIO pin wired to the PV (power-valid) pin of the current monitor holding
+                                `POWER_TRIGGER_CHANNEL`. When set, main power is only scanned when that pin changes,
+                                otherwise it is polled every second.
         """
         self._rgb_pin_map = pins
-        self._rgb_color_default = rgb_color
-        self._rgbw_color_default = rgbw_color
-        self._rgbw_truth_table = pin_rgbw_truth
+        self._rgbw_mask: int = pin_rgbw_mask  # Bit N is set if channel N has RGBW LEDs
+        # Default color for each channel, these don't change after init
+        self._default_colors: tuple = tuple(rgbw_color if (pin_rgbw_mask >> idx) & 1 else rgb_color
+                                            for idx in range(0, len(pins)))
         self._led_count_by_pin = pin_led_counts
         self._chan_names: tuple = pin_names
+        self._name_to_chan: dict or None = {name: idx for idx, name in enumerate(pin_names)} if pin_names else None
+
+        self.rgb_pixel_strings: tuple or None = None
+        self._initAllPins(init_to_on=initialize_to_on)
 
         self._current_monitor = current_monitor
         self._main_power: bool = False
         self._main_power_restore_state: bool = restore_state_on_main_power
         self._CBK_scanForPower(None)    # Make sure we set _main_power from actual hardware status
-        self._power_scan_timer: Timer = Timer(-1)
-        # This does an actual scan of the current sensor, so it can't be run too frequently
-        self._power_scan_timer.init(period=1000, callback=self._CBK_scanForPower)
-
-        self.rgb_pixel_strings: tuple = self._initAllPins(init_to_on=initialize_to_on)
+        # Referencing a bound method allocates, so keep one around for the interrupt handler to hand to schedule()
+        self._scan_for_power_ref = self._CBK_scanForPower
+        self._power_scan_timer: Timer or None = None
+        self._power_alert_pin: Pin or None = None
+        if power_alert_pin is not None:
+            current_monitor.setPowerValidLimits(POWER_TRIGGER_CHANNEL // 3, POWER_TRIGGER_VOLTAGE, POWER_LOST_VOLTAGE)
+            self._power_alert_pin = Pin(power_alert_pin, Pin.IN, Pin.PULL_UP)
+            self._power_alert_pin.irq(trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING, handler=self._INTHNDLR_scanForPower)
+        else:
+            self._power_scan_timer = Timer(-1)
+            # This does an actual scan of the current sensor, so it can't be run too frequently
+            self._power_scan_timer.init(period=1000, callback=self._INTHNDLR_scanForPower)
 
         collect()
 
@@ -70,46 +86,86 @@ class LedControl:
         return self._chan_names
 
     def printChannelNameMap(self):
-        for idx in range(0, len(self.rgb_pixel_strings)-1):
-            print(f"{idx}: {self._chan_names[idx]}")
+        if self._chan_names is None:
+            return
+
+        for idx, name in enumerate(self._chan_names):
+            print(idx, name, sep=": ")
 
     def chanIsRgbw(self, chan_num: int):
-        return True if self.rgb_pixel_strings[chan_num].bpp == RGBW_BPP else False
+        return (self._rgbw_mask >> chan_num) & 1 == 1
+
+    def _INTHNDLR_scanForPower(self, _):
+        """
+        Timer/power-valid pin handler, defers the power scan to the main context since it does I2C and may touch all
+        the LED strings
+
+        """
+        try:
+            schedule(self._scan_for_power_ref, None)
+        except RuntimeError:
+            pass    # Schedule queue is full, the next tick will pick the scan up
 
     def _CBK_scanForPower(self, _):
         """
-        This is currently just a hack that will re-run the pin init to turn the LEDs on. Will need to be changed in
-        the future if/when animations and such are added.
+        Checks the main power state, and restores the default colors to the LEDs when main power comes back (if
+        enabled). Will need to be changed in the future if/when animations and such are added.
 
         """
-        if self._current_monitor.readChannelBusVoltage(0) >= POWER_TRIGGER_VOLTAGE:
-            if not self._main_power:
-                self._main_power = True
-                if self._main_power_restore_state:
-                    self._initAllPins(init_to_on=True)
-        else:
-            if self._main_power:
-                self._main_power = False
+        power_on = self._current_monitor.readChannelBusVoltage(POWER_TRIGGER_CHANNEL) >= POWER_TRIGGER_VOLTAGE
+        if power_on == self._main_power:
+            return
 
+        self._main_power = power_on
+        if power_on and self._main_power_restore_state:
+            self._restoreAllPins()
 
-    def _initAllPins(self, init_to_on = False) -> tuple:
+    def _restoreAllPins(self):
         """
-        Initializes all RGB(w) pins with the provided pin numbers and LED counts
+        Flood fills the default colors back into the already initialized RGB(W) pins, reusing their existing buffers
 
-        :param pins:
-        :return: Tuples of all initialized RGB pins (NeoPixel)
         """
+        pixel_strings = self.rgb_pixel_strings
+        default_colors = self._default_colors
+        for idx in range(0, len(pixel_strings)):
+            px = pixel_strings[idx]
+            px.fill(default_colors[idx])
+            px.write()
+
+    def _ensurePinsInitialized(self):
+        """
+        Creates the NeoPixel strings for all RGB(W) pins with the provided pin numbers and LED counts. This only does
+        anything the first time it's called, the pins and counts never change so the strings (and their buffers) are
+        reused from then on.
+
+        """
+        if self.rgb_pixel_strings is not None:
+            return
+
         rgb_pins = []
         for idx in range(0, len(self._rgb_pin_map)):
             rgb_pins.append(self.initPin(
                 self._rgb_pin_map[idx],
                 self._led_count_by_pin[idx],
-                has_white=self._rgbw_truth_table[idx],
-                default_color=None if not init_to_on
-                              else (self._rgbw_color_default if self._rgbw_truth_table[idx] else self._rgb_color_default))
+                has_white=bool((self._rgbw_mask >> idx) & 1),
+                # There aren't enough PIO state machines for every pin, the rest fall back to the CPU-driven NeoPixel
+                state_machine=idx if idx < PIO_STATE_MACHINE_COUNT else None)
             )
 
-        return tuple(rgb_pins)
+        self.rgb_pixel_strings = tuple(rgb_pins)
+
+    def _initAllPins(self, init_to_on = False) -> tuple:
+        """
+        Initializes all RGB(w) pins, and sets them to their default colors if requested
+
+        :param init_to_on: Flood fill the default colors into all pins
+        :return: Tuples of all initialized RGB pins (NeoPixel)
+        """
+        self._ensurePinsInitialized()
+        if init_to_on:
+            self._restoreAllPins()
+
+        return self.rgb_pixel_strings
 
 
     def initPin(self,
@@ -117,6 +173,7 @@ class LedControl:
                 led_count: int = DEFAULT_CHANNEL_LED_COUNT,
                 has_white=False,
                 default_color = None,
+                state_machine: int = None,
                 ) -> NeoPixel:
         """
         Sets up a RP2040 pin for RGB LED control and will flood fill the default color if set
@@ -125,8 +182,12 @@ class LedControl:
         :param led_count: Number of LEDs attached to this pin
         :param has_white: LED modules have a discrete white LED
         :param default_color: If set, will flood fill the LEDs on the provided pin with the provided color tuple
+        :param state_machine: If set, the PIO state machine (0-7) to drive the pin with, otherwise the CPU drives it
         """
-        px = NeoPixel(Pin(pin, mode=Pin.OUT), led_count, bpp=4 if has_white else 3)
+        if state_machine is not None:
+            px = PioNeoPixel(state_machine, Pin(pin, mode=Pin.OUT), led_count, bpp=4 if has_white else 3)
+        else:
+            px = NeoPixel(Pin(pin, mode=Pin.OUT), led_count, bpp=4 if has_white else 3)
 
         if default_color is not None:
             px.fill(default_color)
@@ -134,6 +195,7 @@ class LedControl:
 
         return px
 
+    @micropython.native
     def setAll(self, r, g, b, w = None):
         """
         Sets all RGB LEDs to the provided color, or, when `w` is also set, will set the RGBW LEDs (not the RGB).
@@ -144,8 +206,46 @@ class LedControl:
         :param w: White color value
         :return:
         """
-        for chan_num in range(0, len(self.rgb_pixel_strings)):
-            self.setChannelColor(chan_num, r, g, b, w)
+        rgb_pattern = self._colorPattern((r, g, b))
+        rgbw_pattern = self._colorPattern((r, g, b, w if w is not None else 0))
+        # Hoisted out of the loop, attribute lookups aren't free
+        flood = self._flood
+        pixel_strings = self.rgb_pixel_strings
+        rgbw_mask = self._rgbw_mask
+        for chan_num in range(0, len(pixel_strings)):
+            flood(pixel_strings[chan_num], rgbw_pattern if rgbw_mask & (1 << chan_num) else rgb_pattern)
+
+    def _colorPattern(self, color: tuple) -> bytearray:
+        """
+        Converts a color tuple into the bytes of a single pixel, in the NeoPixel buffer's byte order
+
+        :param color: (r, g, b) or (r, g, b, w)
+        :return: One pixel's worth of bytes
+        """
+        pattern = bytearray(len(color))
+        for idx in range(0, len(color)):
+            pattern[NeoPixel.ORDER[idx]] = color[idx]
+        return pattern
+
+    def _flood(self, px: NeoPixel, pattern: bytearray):
+        """
+        Flood fills a pixel string by copying a pixel pattern straight into its buffer (much cheaper than
+        `NeoPixel.fill()`, which sets each byte from Python), then writes it out. The filled part of the buffer is
+        doubled on every copy, so this only takes log2(LED count) slice copies and never allocates a full-size buffer.
+
+        :param px: The pixel string to fill
+        :param pattern: A single pixel's bytes, see `_colorPattern`
+        """
+        buf = memoryview(px.buf)
+        total = len(buf)
+        filled = len(pattern)
+        buf[0:filled] = pattern
+        while filled < total:
+            step = min(filled, total - filled)
+            buf[filled:filled + step] = buf[0:step]
+            filled += step
+
+        px.write()
 
     def clearAll(self):
         """
@@ -154,6 +254,7 @@ class LedControl:
         """
         self.setAll(0, 0, 0, 0)
 
+    @micropython.native
     def setChannelColor(self, chan_num: int,  r: int, g: int, b: int, w: int = None):
         """
         Sets the color for all LEDs in a channel
@@ -164,16 +265,17 @@ class LedControl:
         :param b: Blue value (0-255)
         :param w: (optional) White parameter for RGBW LEDs (0-255)
         """
-        self.rgb_pixel_strings[chan_num].fill((r,g,b,w) if self.chanIsRgbw(chan_num) is not None else (r,g,b))
-        self.rgb_pixel_strings[chan_num].write()
+        self._flood(self.rgb_pixel_strings[chan_num], self._colorPattern(
+            (r, g, b, w if w is not None else 0) if self._rgbw_mask & (1 << chan_num) else (r, g, b)))
 
     def getChannelByName(self, name: str) -> int or None:
         """
-        WARNING: This is slow by nature of doing a search in the channel name tuple
+        Looks up a channel number by its name
+
         :param name:
-        :return:
+        :return: The channel number, or `None` if there are no channel names or `name` is not one of them
         """
-        if self._chan_names is None:
+        if self._name_to_chan is None:
             return None
 
-        return self._chan_names.index(name)
+        return self._name_to_chan.get(name)
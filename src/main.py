@@ -13,6 +13,7 @@ from peripherals import picoled
 pico_led = picoled.PicoLed()
 pico_led.blink(20)
 
+from channel_maps import CHANNEL_NAMES
 from leds import LedControl
 from peripherals import ina3221, ads1115, dht20
 
@@ -27,34 +28,12 @@ alloc_emergency_exception_buf(256)
 DeviceName = "Amethyst LED Controller"
 Initialized = False
 
-# Lian Li AF120/Infinity
-# These are in sequence order, edges start at the power connector and move clockwise when looking at the side of the
-# fan with the hub supports
-# Hub - 8 LEDs
-# Top Right - 3
-# Top Left - 3
-# Bottom Left - 3
-# Bottom Right - 3
-# 20 Total LEDs
-
-CHANNEL_NAMES = (
-    "Top Left",                 # 0
-    "Top Fans",                 # 1
-    "Top Right",                # 2
-    "Back Left",                # 3
-    "Front Left",               # 4
-    "Front Right",              # 5
-    "Panel Strip",              # 6
-    "Side Fans",                # 7
-    "Bottom Fans",              # 8
-    "Bottom Left",              # 9
-    "Bottom Back and Right",    # 10
-    "Bottom Front"              # 11
-)
-
 SHUNT_RESISTOR_VALUE = 0.03  # All 4 current monitor boards use 0.03 Ohm shunts
 CURRENT_MON_CRIT_PINS = (11, 10, 26, 22)
 ADC_ALERT_PINS = (9, 8)
+# The INA3221s and ADS1115s can do Fast-mode Plus (1MHz), but the DHT20 tops out at Fast-mode, so the shared bus has to
+# stay at 400kHz. Move the DHT20 to its own bus before raising this.
+I2C_FREQ = const(400_000)
 
                     # SCL, SDA
 EXTERNAL_I2C_PINS = (15, 14)
@@ -77,14 +56,16 @@ def initializeController():
     global leds, i2c, current, adc, Initialized, dht
 
     pico_led.blink(50)
-    i2c = I2C(1, scl=Pin(7), sda=Pin(6))
+    i2c = I2C(1, scl=Pin(7), sda=Pin(6), freq=I2C_FREQ)
 
     pico_led.blink(100)
     current = ina3221.INA3221(i2c)
-    current.addDevice(0x40, "Channels 0-2", shunt_value=SHUNT_RESISTOR_VALUE)
-    current.addDevice(0x41, "Channels 3-5", shunt_value=SHUNT_RESISTOR_VALUE)
-    current.addDevice(0x42, "Channels 6-8", shunt_value=SHUNT_RESISTOR_VALUE)
-    current.addDevice(0x43, "Channels 9-11", shunt_value=SHUNT_RESISTOR_VALUE)
+    current.addDevices((
+        (0x40, "Channels 0-2"),
+        (0x41, "Channels 3-5"),
+        (0x42, "Channels 6-8"),
+        (0x43, "Channels 9-11"),
+    ), shunt_value=SHUNT_RESISTOR_VALUE)
 
     pico_led.blink(300)
     adc = ads1115.ADS1115(i2c)
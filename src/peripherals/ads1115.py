@@ -12,7 +12,7 @@ from gc import collect
 import time
 from machine import I2C
 from micropython import const
-from struct import unpack, pack
+from struct import pack
 
 CTXT_NONE = 0
 CTXT_ENTER = 1
@@ -81,17 +81,35 @@ LSB_1_024 = const(0.00003125)
 LSB_0_512 = const(0.000015625)
 LSB_0_256 = const(0.0000078125)
 
-# FSR config values after bitwise and-ing with 0xE on top config byte
-FSR_LSB_IDX_MAP = (0, 2, 4, 6, 8, 10, 12, 14)
+# Indexed by the FSR config bits, i.e. `(config[0] & 0xE) >> 1`
 LSB_MAP = (LSB_6_144, LSB_4_096, LSB_2_048, LSB_1_024, LSB_0_512, LSB_0_256, LSB_0_256, LSB_0_256)
 
+# Conversion period for each data rate in microseconds (1/SPS plus 10% for the internal oscillator's tolerance), indexed
+# by the data rate config bits, i.e. `config[1] >> 5`
+CONV_PERIOD_US = (137500, 68750, 34375, 17188, 8594, 4400, 2316, 1280)
+
 # These only map (AIp=>GND) not (AIp=>AIn),
 CHAN_MAP = (CFG_MUX_AIN0_GND, CFG_MUX_AIN1_GND, CFG_MUX_AIN2_GND, CFG_MUX_AIN3_GND)
 
 
+@micropython.viper
+def _s16be(buf: ptr8) -> int:
+    """
+    Decodes a big-endian signed short (the conversion register format)
+
+    :param buf: The 2 bytes read from the register
+    :return: Signed register value
+    """
+    value = (int(buf[0]) << 8) | int(buf[1])
+    if value & 0x8000:
+        value -= 0x10000
+    return value
+
+
 class ADS1115Error(Exception): pass
 class ADSDoesNotExistError(ADS1115Error): pass
 class ADSConfigError(ADS1115Error): pass
+class ADSTimeoutError(ADS1115Error): pass
 
 class _ADS1115Device:
     """
@@ -111,45 +129,54 @@ class _ADS1115Device:
         self._i2c: I2C = i2c
         self.address: int = addr
         self.name: str = name
-        self.config: bytearray[2] = config
-        self._config_packet: bytearray[3] = bytearray((ADDR_CONFIG_REG, 0x0, 0x0))
-        self._config_addr: bytes[1] = bytes((ADDR_CONFIG_REG,))
+        # Copied, as the default (and the manager's defaults) are shared between devices
+        self.config: bytearray[2] = bytearray(config)
         self._i2c_packet: bytearray[3] = bytearray(3)
-        self._reg_address: bytearray[1] = bytearray(1)
+        self._read_buf: bytearray[2] = bytearray(2)
+        self._os_buf: bytearray[1] = bytearray(1)   # High byte of the config register, holds the OS bit
         self._last_read_value: int = 0
+        self._lsb: float = 0.0
 
         if writeCfg:
             self.writeConfig()
 
         self.readConfiguration()
 
-    @micropython.native
     def writeConfig(self):
         """
         Writes the config bytes out to the device
 
         :return: `True` on successful write, `False` otherwise
         """
-        self._config_packet[1:] = self.config[0:]
-        self._i2c.writeto(self.address, self._config_packet)
-
-        if self._i2c.readfrom(self.address, 2) == self.config:
-            # The ADS returns before it has finished saving the config, and without this, _weird_ shit happens if you
-            # cycle through channels (thus changing the config). Happened after I optimized the code.
-            time.sleep_ms(30)
+        self._i2c.writeto_mem(self.address, ADDR_CONFIG_REG, self.config)
+
+        # The OS bit reads back differently to how it was written (writing 1 starts a conversion, reading 1 means idle),
+        # so it's left out of the comparison
+        readback = self._read_buf
+        self._i2c.readfrom_into(self.address, readback)
+        if (readback[0] & 0x7F) == (self.config[0] & 0x7F) and readback[1] == self.config[1]:
+            # The ADS returns before it has finished converting with the new config, and without waiting for that,
+            # _weird_ shit happens if you cycle through channels (thus changing the config), as stale conversions from
+            # the old channel get read.
+            if self.config[0] & (CFG_OP_MODE_SNGL >> 8):
+                self._waitConvReady()
+            else:
+                # No OS bit to watch in continuous mode, wait out the conversion in flight and the first one made
+                # with the new config
+                time.sleep_us(2 * CONV_PERIOD_US[self.config[1] >> 5])
+            self._updateLsb()
             return
 
         raise ADSConfigError("Returned configuration from device did not match local configuration")
 
-    @micropython.native
     def readConfiguration(self) -> bytearray:
         """
         Reads the configuration register of the active device
 
         :return: The 2 bytes of configuration for the active device
         """
-        self._i2c.writeto(self.address, self._config_packet[:1])
-        self.config = bytearray(self._i2c.readfrom(self.address, 2))
+        self._i2c.readfrom_mem_into(self.address, ADDR_CONFIG_REG, self.config)
+        self._updateLsb()
 
         return self.config
 
@@ -161,7 +188,6 @@ class _ADS1115Device:
         """
         print(f"High Byte: {self.config[0]:#{int_format_code}}\nLow Byte:  {self.config[1]:#{int_format_code}}")
 
-    @micropython.native
     def setActiveChannel(self, chan_num: int) -> int:
         """
         Sets the active ADC channel in the device's mux
@@ -195,24 +221,41 @@ class _ADS1115Device:
         self.config |= sps
         self.writeConfig()
 
-    def _getLsbValue(self) -> float:
+    def _updateLsb(self):
+        """
+        Caches the LSB value for the FSR (Full-Scale Range) in the current config, must be called whenever the config
+        changes
+        """
+        self._lsb = LSB_MAP[(self.config[0] & 0xE) >> 1]
+
+    def _waitConvReady(self):
         """
-        Uses the static lookup tuples defined above to determine which LSB value maps to what FSR (Full-Scale Range)
+        Busy-waits on the OS bit until the device isn't performing a conversion. Only reads the high byte of the config
+        register, which is all the OS bit needs.
 
-        :return: Least significant bit value for the current FSR setting in the config
+        :raises ADSTimeoutError: If the conversion takes longer than twice the conversion period for the data rate
         """
-        return LSB_MAP[FSR_LSB_IDX_MAP.index(self.config[0] & 0xE)]
+        timeout = 2 * CONV_PERIOD_US[self.config[1] >> 5]
+        start = time.ticks_us()
+        while True:
+            self._i2c.readfrom_mem_into(self.address, ADDR_CONFIG_REG, self._os_buf)
+            if self._os_buf[0] & (CFG_OS_STAT_READ_NOCONV >> 8):
+                return
+            if time.ticks_diff(time.ticks_us(), start) > timeout:
+                raise ADSTimeoutError(f"Timed out waiting for a conversion on {self.address:#x}")
 
     @micropython.native
     def readValue(self) -> int:
         """
-        Reads the value of the last ADC conversion
+        Reads the value of the last ADC conversion, in single-shot mode this waits for any in-flight conversion to
+        finish first
 
         :return: Converted ADC value
         """
-        self._reg_address[0] = ADDR_CONVERSION_REG
-        self._i2c.writeto(self.address, self._reg_address)
-        self._last_read_value = unpack(">h",  self._i2c.readfrom(self.address, 2))[0]
+        if self.config[0] & (CFG_OP_MODE_SNGL >> 8):
+            self._waitConvReady()
+        self._i2c.readfrom_mem_into(self.address, ADDR_CONVERSION_REG, self._read_buf)
+        self._last_read_value = _s16be(self._read_buf)
         return self._last_read_value
 
     @micropython.native
@@ -223,7 +266,7 @@ class _ADS1115Device:
 
         :return: Last ADC conversion in Volts
         """
-        return self._getLsbValue() * self.readValue()
+        return self._lsb * self.readValue()
 
     def _setThresh(self, thresh_reg: int, thresh_val: int):
         """
@@ -271,40 +314,15 @@ class ADS1115:
         :param device_defaults: Config to apply to the ADS1115 at initialization
         """
         self._i2c = i2c
-        self._device_defaults: bytearray = bytearray(device_defaults.to_bytes(2, "big"))
+        self._device_defaults: bytearray = bytearray(2)
+        self._device_defaults[0] = device_defaults >> 8
+        self._device_defaults[1] = device_defaults & 0xFF
         self._devices: list[_ADS1115Device] = list()
         self._current_device_idx = 0
         self.device: _ADS1115Device or None = None
 
-        ## Everything below is designed to prevent allocations for the operations of this class
-        self._two_byte_value = bytearray(2)
-        self._config_register_cache = bytearray((ADDR_CONFIG_REG, 0x0, 0x0))
-
         collect()  # Take any GC hits at init time
 
-    def _read(self, num_bytes: int, address: int or None = None) -> bytes:
-        """
-        Sugar for reading from the current INA3221
-
-        :param num_bytes: Number of bytes to expect/read
-        :param address: (Optional) Override the address being read from
-
-        :return: The returned bytes from the i2c bus
-        """
-        return self._i2c.readfrom(self.device.address if address is None else address, num_bytes)
-
-
-    def _write(self, value: bytearray or bytes, valueHasAddress: int = False):
-        """
-        Sugar for writing to the current INA3221
-
-        :param value: Value to write to the i2c bus
-        :param valueHasAddress: Allow overriding of the current device addr stored on the class
-                                (address must be first byte of `value`)
-        """
-        self._i2c.writeto(self.device.address if not valueHasAddress else value[0],
-                          value if not valueHasAddress else value[1:])
-
     def addDevice(self, device_addr: int, device_name: str, config: int = None) -> int:
         """
         Adds a device to the list of ADS1115 devices under management.
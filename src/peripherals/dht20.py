@@ -5,6 +5,7 @@ Management for DHT20 temp/humidity sensor.
 
 Copyright (C) 2022 Nick Whalen (purplxed@projectneutron.com)
 """
+import micropython
 from gc import collect
 
 import gc
@@ -14,6 +15,36 @@ from time import sleep_ms
 
 DEV_ADDR = const(0x38)
 
+_STATUS_CMD = bytes((0x71,))
+_TRIG_CMD = bytes((0xAC, 0x33, 0x00))
+
+# Raw readings are fractions of 2^20, scaled to %RH and a 200C span (no FPU on the RP2040, so multiply don't divide)
+_HUMID_SCALE = 100.0 / 0x100000
+_TEMP_SCALE = 200.0 / 0x100000
+
+
+@micropython.viper
+def _rawHumidity(buf: ptr8) -> int:
+    """
+    Extracts the 20-bit raw humidity value from a measurement read
+
+    :param buf: The 7 bytes read from the device
+    :return: Raw humidity value
+    """
+    return (int(buf[1]) << 12) | (int(buf[2]) << 4) | (int(buf[3]) >> 4)
+
+
+@micropython.viper
+def _rawTemperature(buf: ptr8) -> int:
+    """
+    Extracts the 20-bit raw temperature value from a measurement read
+
+    :param buf: The 7 bytes read from the device
+    :return: Raw temperature value
+    """
+    return ((int(buf[3]) & 0xF) << 16) | (int(buf[4]) << 8) | int(buf[5])
+
+
 class Dht20Error(Exception): pass
 
 class Dht20:
@@ -23,7 +54,7 @@ class Dht20:
         """
         self._i2c = i2c
         self._address = 0x38
-        self._recv_buffer = bytearray(6)
+        self._recv_buffer = bytearray(7)
         self._humid = 0.0
         self._temp = 0.0
 
@@ -41,27 +72,21 @@ class Dht20:
         self._readDevice()
         return self._temp
 
-    def _write(self, data: bytearray or bytes):
-        """
-        Writes the send buffer to the device
-
-        :return:
-        """
-        self._i2c.writeto(DEV_ADDR, bytes(data))
-
     def _read(self, num_bytes: int):
         """
-        Reads the requested number of bytes from the device
+        Reads the requested number of bytes from the device into the receive buffer
 
         """
-        self._recv_buffer = bytearray(num_bytes)
-        self._recv_buffer = self._i2c.readfrom(DEV_ADDR, num_bytes)
+        if num_bytes == len(self._recv_buffer):
+            self._i2c.readfrom_into(DEV_ADDR, self._recv_buffer)
+        else:
+            self._i2c.readfrom_into(DEV_ADDR, memoryview(self._recv_buffer)[:num_bytes])
 
     def _checkStatus(self):
         """
         Soft-resets the device
         """
-        self._write((0x71,))
+        self._i2c.writeto(DEV_ADDR, _STATUS_CMD)
         sleep_ms(10)
         self._read(1)
         if (self._recv_buffer[0] & 0x18) != 0x18:
@@ -72,14 +97,9 @@ class Dht20:
         Reads temperature and humidity data from the device
 
         """
-        self._write((0xAC, 0x33, 0x00))
+        self._i2c.writeto(DEV_ADDR, _TRIG_CMD)
         sleep_ms(80)    # Per datasheet
-        self._read(7)
-
-        self._humid = ((
-            (self._recv_buffer[1] << 12) | (self._recv_buffer[2] << 4) | (self._recv_buffer[3] >> 4)) / 0x100000
-                      ) * 100
+        self._i2c.readfrom_into(DEV_ADDR, self._recv_buffer)
 
-        self._temp = ((
-            (((self._recv_buffer[3] & 0xF) << 16) | (self._recv_buffer[4] << 8) | self._recv_buffer[5]) / 0x100000
-                      ) * 200.0) - 50
+        self._humid = _rawHumidity(self._recv_buffer) * _HUMID_SCALE
+        self._temp = (_rawTemperature(self._recv_buffer) * _TEMP_SCALE) - 50
@@ -10,27 +10,30 @@ Copyright (C) 2022 Nick Whalen (purplxed@projectneutron.com)
 import micropython
 from array import array
 from machine import I2C
-from math import floor
 from micropython import const
 from gc import collect
-from struct import unpack
 
 DEVICE_SHUNT_LSB = 0.00004
 DEVICE_BUS_LSB = 0.008
 
 SHUNT_VOLTAGE = const(1)
 BUS_VOLTAGE = const(2)
+# LSB for each voltage type, indexed by SHUNT_VOLTAGE/BUS_VOLTAGE
+VOLTAGE_LSB_MAP = (0.0, DEVICE_SHUNT_LSB, DEVICE_BUS_LSB)
 
 ADDR_CONFIG_REG = const(0x0)
 CFG_REG_DATA_BEGIN = const(1)
-MANUFACTURER_REGISTER = bytes((0xFE,))
+MANUFACTURER_REGISTER = const(0xFE)
 MANUFACTURER_VALUE = const(0x5449)
-DIE_ID_REGISTER = bytes((0xFF,))
+DIE_ID_REGISTER = const(0xFF)
 DIE_ID_VALUE = const(0x3220)
+ADDR_PV_UPPER_LIMIT_REG = const(0x10)
+ADDR_PV_LOWER_LIMIT_REG = const(0x11)
 
 VOLT_READ_CFG_DEVICE = const(0)
 VOLT_READ_CFG_DEV_CHANNEL = const(1)
 VOLT_READ_CFG_I2C_DATA = const(2)
+VOLT_READ_CFG_SIZE = const(4)
 
 # Device Reset
 CONFIG_RESET = const(0x8000)
@@ -77,8 +80,39 @@ OPMODE_CONT_SHUNT_BUS = const(0x7)
 
 
 
+@micropython.viper
+def _decodeVoltageRegister(buf: ptr8) -> int:
+    """
+    Decodes a shunt/bus voltage register read, a big-endian signed short whose 3 LSB are unused (per datasheet)
+
+    :param buf: The 2 bytes read from the register
+    :return: Raw register value, in LSBs
+    """
+    value = (int(buf[0]) << 8) | int(buf[1])
+    if value & 0x8000:
+        value -= 0x10000
+    return value >> 3
+
+
+@micropython.viper
+def _decodeVoltageRegisters(buf: ptr8, out: ptr32, count: int):
+    """
+    Decodes `count` back-to-back voltage register reads (see `_decodeVoltageRegister`) in one call
+
+    :param buf: The register reads, 2 bytes per register
+    :param out: Raw register values, in LSBs (an `array("i")` of at least `count` entries)
+    :param count: Number of registers in `buf`
+    """
+    for i in range(count):
+        value = (int(buf[i*2]) << 8) | int(buf[i*2 + 1])
+        if value & 0x8000:
+            value -= 0x10000
+        out[i] = value >> 3
+
+
 class INACommonError(Exception): pass
 class INADoesNotExistError(INACommonError): pass
+class INATooManyDevicesError(INACommonError): pass
 
 class _INADevice:
     """
@@ -88,7 +122,6 @@ class _INADevice:
     def __init__(self, addr: int, name: str, shunt_resistor_value: float):
         self.address: int = addr
         self.name: str = name
-        self.channel_voltages = array("f", (0.0, 0.0, 0.0))
         self.shunt_resistor_values = array("f", (shunt_resistor_value, shunt_resistor_value, shunt_resistor_value))
 
     def setShuntResistorValue(self, channel: int, value: float):
@@ -108,60 +141,72 @@ class INA3221:
                                         CH1_ENABLE|CH2_ENABLE|CH3_ENABLE|
                                         AVERAGING_128_SAMPLES|
                                         BUS_CONVERSION_TIME_1_1ms|SHUNT_CONVERSION_TIME_1_1ms|
-                                        OPMODE_CONT_SHUNT_BUS):
+                                        OPMODE_CONT_SHUNT_BUS,
+                 max_devices: int = 4):
         """
         Initialize the INA3221 management library
 
         :param i2c: Initialized I2C class
         :param device_defaults: Config to apply to the INA3221 at initialization
+        :param max_devices: Most devices that will be added, all per-device storage is allocated up front for this many
         """
         self._i2c = i2c
+        # Bound I2C method used while polling, looked up once here instead of on every call
+        self._i2c_readmem = i2c.readfrom_mem_into
         self._device_defaults: int = device_defaults
-        self._devices: list[_INADevice] = list()
+        # Config register write for the defaults, built once since most (if not all) devices use it
+        self._device_defaults_packet: bytes = bytes((ADDR_CONFIG_REG,)) + device_defaults.to_bytes(2, "big")
+        # Fixed size so adding devices doesn't grow anything, `_device_count` slots are in use
+        self._devices: list[_INADevice] = [None] * max_devices
+        self._device_count = 0
+        self._channel_count = 0     # Channels on the added devices, the only valid indexes into the per-channel tables
+        # Prebuilt `_volt_read_cfg` for every channel and voltage type, see `_setVoltReadCfgFromChan`
+        self._volt_read_cfg_lut = bytearray(VOLT_READ_CFG_SIZE * 2 * 3 * max_devices)
+        # Per-channel state, flat and indexed by global channel ID (3 channels per device)
+        self._shunt_voltages = array("f", bytes(4 * 3 * max_devices))
+        self._bus_voltages = array("f", bytes(4 * 3 * max_devices))
+        # Each device's slice of the above, handed out by `readAllShuntVoltages()`
+        self._shunt_views = tuple(memoryview(self._shunt_voltages)[i*3:i*3 + 3] for i in range(max_devices))
+        # Indexed by SHUNT_VOLTAGE/BUS_VOLTAGE
+        self._voltage_arrays = (None, self._shunt_voltages, self._bus_voltages)
+        # Raw shunt register value to Amperes, the shunt LSB and resistor value folded together so current reads are a
+        # single multiply (no FPU, so division is expensive)
+        self._current_scales = array("f", bytes(4 * 3 * max_devices))
 
         ## Everything below is designed to prevent allocations for the operations of this class
-        self._channel_id_cache = bytearray(1)   # Helps prevent allocations when talking to INA channels
         self._two_byte_value = bytearray(2)
-        self._shifted_voltage = bytearray(2)
         self._config_register_cache = bytearray((ADDR_CONFIG_REG, 0x0, 0x0))
+        # The config value part of the above, read into directly
+        self._config_value_view = memoryview(self._config_register_cache)[CFG_REG_DATA_BEGIN:]
+        self._cfg_pkt = bytearray(2)    # Scratch config register value for `_configure()`
         self._active_device_addr = 0x40
-        self._volt_read_cfg = bytearray(4)
+        self._volt_read_cfg = bytearray(VOLT_READ_CFG_SIZE)
+        # Per-device batch reads, one 2-byte view per voltage register since the register pointer doesn't auto-increment
+        self._batch_buf = bytearray(12)
+        self._batch_views = tuple(memoryview(self._batch_buf)[i*2:i*2 + 2] for i in range(6))
+        self._batch_raw = array("i", (0, 0, 0, 0, 0, 0))
+        # `readAllDeviceVoltages()` results, 6 per device, along with each device's view of them
+        self._device_voltages = array("f", bytes(4 * 6 * max_devices))
+        self._device_voltage_views = tuple(memoryview(self._device_voltages)[i*6:i*6 + 6] for i in range(max_devices))
 
         collect()   # Take any GC hits at init time
 
-    def _configure(self, device_addr: int, options: int):
+    def _configure(self, device_addr: int, options: int or None = None):
         """
         Configures the device
 
-        :param options:
+        :param device_addr: i2c address of the device
+        :param options: Configuration register value, `None` for the defaults passed in at init
         :return:
         """
-        i2c_packet = bytearray((device_addr, ADDR_CONFIG_REG))
-        i2c_packet += options.to_bytes(2, "big")
-        self._write(i2c_packet, valueHasAddress=True)
-
-    @micropython.native
-    @property
-    def _voltageStorage(self) -> array:
-        return self._devices[
-            self._volt_read_cfg[VOLT_READ_CFG_DEVICE]
-        ].channel_voltages[
-            self._volt_read_cfg[VOLT_READ_CFG_DEV_CHANNEL]
-        ]
-
-    @micropython.native
-    @_voltageStorage.setter
-    def _voltageStorage(self, voltage):
-        self._devices[
-            self._volt_read_cfg[VOLT_READ_CFG_DEVICE]
-        ].channel_voltages[
-            self._volt_read_cfg[VOLT_READ_CFG_DEV_CHANNEL]
-        ] = voltage
+        if options is None:
+            self._i2c.writeto(device_addr, self._device_defaults_packet)
+            return
 
-    @micropython.native
-    @property
-    def _voltageShuntValues(self) -> array:
-        return self._devices[self._volt_read_cfg[0]].shunt_resistor_values
+        cfg_pkt = self._cfg_pkt
+        cfg_pkt[0] = (options >> 8) & 0xFF
+        cfg_pkt[1] = options & 0xFF
+        self._i2c.writeto_mem(device_addr, ADDR_CONFIG_REG, cfg_pkt)
 
     def _getDeviceIdxFromChannel(self, channel_id: int) -> int:
         """
@@ -171,7 +216,7 @@ class INA3221:
 
         :return: The global device id (not the device's i2c address)
         """
-        return floor(channel_id / 3) # All INA3221s have 3 channels
+        return channel_id // 3 # All INA3221s have 3 channels
 
     def _getDeviceLocalChannelIdx(self, device_id: int, channel_id: int) -> int:
         """
@@ -196,10 +241,29 @@ class INA3221:
 
         :return: Internal device number
         """
-        self._devices.append(_INADevice(device_addr, device_name, shunt_value))
-        device_id = len(self._devices)-1
+        device_id = self._device_count
+        if device_id == len(self._devices):
+            raise INATooManyDevicesError(f"Cannot add {device_addr:#x}, already managing {device_id} devices")
+
+        self._devices[device_id] = _INADevice(device_addr, device_name, shunt_value)
+        scale = DEVICE_SHUNT_LSB / shunt_value
+        lut = self._volt_read_cfg_lut
+        for local_channel in range(0, 3):
+            channel = (device_id * 3) + local_channel
+            self._current_scales[channel] = scale
+            for voltage_type in (SHUNT_VOLTAGE, BUS_VOLTAGE):
+                entry = ((channel * 2) + voltage_type - 1) * VOLT_READ_CFG_SIZE
+                lut[entry + VOLT_READ_CFG_DEVICE] = device_id
+                lut[entry + VOLT_READ_CFG_DEV_CHANNEL] = local_channel
+                # I2C address of the device
+                lut[entry + VOLT_READ_CFG_I2C_DATA] = device_addr
+                # Voltage register address on the device, the shunt and bus registers for a channel are next to each
+                # other, starting at 0x1
+                lut[entry + VOLT_READ_CFG_I2C_DATA+1] = (local_channel * 2) + voltage_type
+        self._device_count += 1
+        self._channel_count = self._device_count * 3
         try:
-            self._configure(device_addr, config if config is not None else self._device_defaults)
+            self._configure(device_addr, config)
         except OSError as e:
             if e.errno == 5:
                 raise INADoesNotExistError(f"Device {device_addr:#x} does not exist on the i2c bus")
@@ -207,6 +271,22 @@ class INA3221:
 
         return device_id
 
+    def addDevices(self, devices: tuple, shunt_value: float = 0.1) -> int:
+        """
+        Adds several devices that share the same shunt resistor value and the default configuration (see `addDevice`).
+        Each device is configured with a single write of the prebuilt default config packet.
+
+        :param devices: Tuple of (device address, nice name) pairs
+        :param shunt_value: Default shunt resistor value, in ohms
+
+        :return: Internal device number of the last device added
+        """
+        device_id = -1
+        for device_addr, device_name in devices:
+            device_id = self.addDevice(device_addr, device_name, shunt_value=shunt_value)
+
+        return device_id
+
     def setChannelShuntResistor(self, channel_id: int, shunt_resistor_value: float):
         """
         Sets the shut resistor value (in ohms) for the specified channel
@@ -215,8 +295,25 @@ class INA3221:
         :param shunt_resistor_value: Shunt resistor value in ohms
         """
         device_id = self._getDeviceIdxFromChannel(channel_id)
-        self._devices[device_id]. \
-            shunt_resistor_values[self._getDeviceLocalChannelIdx(device_id, channel_id)] = shunt_resistor_value
+        self._devices[device_id].setShuntResistorValue(
+            self._getDeviceLocalChannelIdx(device_id, channel_id), shunt_resistor_value)
+        self._current_scales[channel_id] = DEVICE_SHUNT_LSB / shunt_resistor_value
+
+    def setPowerValidLimits(self, device_id: int, upper_limit: float, lower_limit: float):
+        """
+        Sets the power-valid limits of a device. The PV pin is released (goes high through its pull-up) once all bus
+        voltages rise above `upper_limit`, and pulled low again when any of them falls below `lower_limit`.
+
+        :param device_id: ID of the device to set the limits on
+        :param upper_limit: Bus voltage, in Volts, all channels need to reach for power to be valid
+        :param lower_limit: Bus voltage, in Volts, below which power is no longer valid
+        """
+        addr = self.getDeviceAddr(device_id)
+        # Limits use the bus voltage register format: 8mV LSB, with the 3 LSB of the register unused
+        self._i2c.writeto(addr, bytes((ADDR_PV_UPPER_LIMIT_REG,)) +
+                          (int(upper_limit / DEVICE_BUS_LSB) << 3).to_bytes(2, "big"))
+        self._i2c.writeto(addr, bytes((ADDR_PV_LOWER_LIMIT_REG,)) +
+                          (int(lower_limit / DEVICE_BUS_LSB) << 3).to_bytes(2, "big"))
 
     def getDeviceAddr(self, device_id: int) -> int:
         """
@@ -226,6 +323,8 @@ class INA3221:
 
         :return: i2c address of the device
         """
+        if not 0 <= device_id < self._device_count:
+            raise IndexError(f"Device {device_id} is not a managed device")
         return self._devices[device_id].address
 
     def setActiveDevice(self, device_id: int):
@@ -239,70 +338,36 @@ class INA3221:
             return
         self._active_device_addr = addr
 
-    @micropython.native
-    def _read(self, num_bytes: int, address: int or None = None) -> bytes:
-        """
-        Sugar for reading from the current INA3221
-
-        :param num_bytes: Number of bytes to expect/read
-        :param address: (Optional) Override the address being read from
-
-        :return: The returned bytes from the i2c bus
-        """
-        return self._i2c.readfrom(self._active_device_addr if address is None else address, num_bytes)
-
-    @micropython.native
-    def _write(self, value: bytearray or bytes, valueHasAddress: int = False):
-        """
-        Sugar for writing to the current INA3221
-
-        :param value: Value to write to the i2c bus
-        :param valueHasAddress: Allow overriding of the current device addr stored on the class
-                                (address must be first byte of `value`)
-        """
-        self._i2c.writeto(self._active_device_addr if not valueHasAddress else value[0],
-                          value if not valueHasAddress else value[1:])
-
-    @micropython.native
+    @micropython.viper
     def _setVoltReadCfgFromChan(self, channel_id: int, voltage_type: int):
         """
-        Translates an internal channel ID to the device ID and channel number for that device
+        Translates an internal channel ID to the device ID and channel number for that device. There's no bounds
+        checking in here, callers must make sure `channel_id` is below `_channel_count`.
 
         :param channel_id: Channel ID to rest the read config for voltages on
         :param voltage_type: SHUNT_VOLTAGE or BUS_VOLTAGE -- Adjusts the device register addresses
         """
-        # The math below gives us the internal index of the device (0-based) based on the channel id
-        self._volt_read_cfg[VOLT_READ_CFG_DEVICE] = self._getDeviceIdxFromChannel(channel_id)
-        # The zero-indexed channel, local to the device struct
-        self._volt_read_cfg[VOLT_READ_CFG_DEV_CHANNEL] = self._getDeviceLocalChannelIdx(
-            self._volt_read_cfg[VOLT_READ_CFG_DEVICE], channel_id)
-        # I2C address of the device
-        self._volt_read_cfg[VOLT_READ_CFG_I2C_DATA] = self._devices[self._volt_read_cfg[VOLT_READ_CFG_DEVICE]].address
+        # Everything is worked out in `addDevice()`, this is just a copy out of the channel's LUT entry
+        volt_read_cfg = ptr8(self._volt_read_cfg)
+        lut = ptr8(self._volt_read_cfg_lut)
+        entry = ((channel_id << 1) + voltage_type - 1) << 2     # VOLT_READ_CFG_SIZE bytes per entry
+        volt_read_cfg[0] = lut[entry]
+        volt_read_cfg[1] = lut[entry + 1]
+        volt_read_cfg[2] = lut[entry + 2]
+        volt_read_cfg[3] = lut[entry + 3]
 
-
-        # The following is an explanation of the fuckery at the end of the return statement. The computation is packed
-        # to avoid allocs.
-
-        # Gives us 0-indexed channel ID on the device (the shunt register without the offset adjustment)
-        # zero_indexed_channel_id = channel_id - (((device_idx+1) * 3) - 3)
-
-        # Creates the offset to net the actual register address we need
-        # (zero_indexed_channel_id * 2) + 1 # gives us the actual register ID on the device
-
-        # Voltage register address on the target device
-        self._volt_read_cfg[VOLT_READ_CFG_I2C_DATA+1] = int((self._volt_read_cfg[1] * 2) + voltage_type)
-
-    @micropython.native
     def _resetDevice(self):
         """
         Sends a reset signal to the selected current monitor
 
         """
-        self._config_register_cache[CFG_REG_DATA_BEGIN:] = self._readConfiguration()
+        addr = self._active_device_addr
+        config = self._i2c.readfrom_mem(addr, ADDR_CONFIG_REG, 2)
+        self._config_register_cache[CFG_REG_DATA_BEGIN] = config[0] | 0x80  # Set the reset bit in the first byte
+        self._config_register_cache[CFG_REG_DATA_BEGIN+1] = config[1]
 
-        self._config_register_cache[CFG_REG_DATA_BEGIN] |= 0x80  # Set the reset bit in the first byte
-
-        self._writeConfiguration(self._config_register_cache) # Device resets as soon as this is written
+        # Device resets as soon as this is written
+        self._i2c.writeto_mem(addr, ADDR_CONFIG_REG, self._config_value_view)
 
     def _validateChipInfo(self) -> bool:
         """
@@ -310,67 +375,71 @@ class INA3221:
 
         :return: True if the chip validated successfully, False otherwise
         """
-        self._write(MANUFACTURER_REGISTER)
-        if self._read(2) != MANUFACTURER_VALUE:
+        addr = self._active_device_addr
+        value = self._two_byte_value
+        self._i2c.readfrom_mem_into(addr, MANUFACTURER_REGISTER, value)
+        if ((value[0] << 8) | value[1]) != MANUFACTURER_VALUE:
             return False
 
-        self._write(DIE_ID_REGISTER)
-        if self._read(2) != DIE_ID_VALUE:
+        self._i2c.readfrom_mem_into(addr, DIE_ID_REGISTER, value)
+        if ((value[0] << 8) | value[1]) != DIE_ID_VALUE:
             return False
 
         return True
 
     @micropython.native
-    def _readConfiguration(self) -> bytes:
+    def _readConfiguration(self) -> memoryview:
         """
         Reads the configuration register of the active device
 
-        :return: The 2 bytes of configuration for the active device
+        :return: The 2 bytes of configuration for the active device (a view of the config cache, overwritten by the next
+                 read)
         """
-        self._write(bytes(ADDR_CONFIG_REG, ))
-        self._config_register_cache[1:] = self._read(2)
+        self._i2c_readmem(self._active_device_addr, ADDR_CONFIG_REG, self._config_value_view)
 
-        return self._config_register_cache[1:]
+        return self._config_value_view
 
     @micropython.native
-    def _writeConfiguration(self, config: bytes):
-        """
-        Writes the provided configuration to the active device's config register.
-
-        :param config: 2 bytes of configuration bits
+    def _readRegister(self, channel: int, voltageType = SHUNT_VOLTAGE) -> int:
         """
-        self._config_register_cache = config
-        self._write(self._config_register_cache)
-
-    @micropython.native
-    def _readVoltage(self, channel: int, voltageType = SHUNT_VOLTAGE) -> float:
-        """
-        Reads a channel's voltage. NOTE: this method computes the appropriate device and voltage registers on the fly
-        and will read those instead of using `self._current_device_addr`. This is because this method has no concept
-        of devices, merely internal channel IDs.
+        Reads a channel's raw voltage register. NOTE: this method computes the appropriate device and voltage registers
+        on the fly and will read those instead of using `self._current_device_addr`. This is because this method has no
+        concept of devices, merely internal channel IDs. `_volt_read_cfg` is left describing the channel that was read.
 
         To anyone reading this other than me... I am sorry. This is designed to be run in a tight loop and, as a result,
         it avoids allocations wherever possible. This has led to the fuckery you now behold below.
 
         :param channel: Internal channel number
 
-        :return: Actual voltage value (in Volts, not milliVolts)
+        :return: Raw register value, in LSBs
         """
+        if not 0 <= channel < self._channel_count:
+            raise IndexError(f"Channel {channel} does not belong to a managed device")
         self._setVoltReadCfgFromChan(channel, voltageType)
+        volt_read_cfg = self._volt_read_cfg
+        value = self._two_byte_value
 
-        self._write(self._volt_read_cfg[VOLT_READ_CFG_I2C_DATA:], valueHasAddress=True)
-        self._two_byte_value = self._read(2, address=self._volt_read_cfg[VOLT_READ_CFG_I2C_DATA])
+        # Register pointer write and read in one transaction (repeated start)
+        self._i2c_readmem(
+            volt_read_cfg[VOLT_READ_CFG_I2C_DATA], volt_read_cfg[VOLT_READ_CFG_I2C_DATA+1], value)
 
-        # Unpacks the 2-byte value into a signed short, then removes the 3 useless LSB (per datasheet)
-        self._shifted_voltage = unpack(">h", self._two_byte_value)[0] >> 3
+        return _decodeVoltageRegister(value)
 
-        self._voltageStorage = self._shifted_voltage * \
-                               (DEVICE_SHUNT_LSB if voltageType == SHUNT_VOLTAGE else DEVICE_BUS_LSB)
+    @micropython.native
+    def _readVoltage(self, channel: int, voltageType = SHUNT_VOLTAGE) -> float:
+        """
+        Reads a channel's voltage, see `_readRegister`
 
-        return self._devices[self._volt_read_cfg[VOLT_READ_CFG_DEVICE]] \
-            .channel_voltages[self._volt_read_cfg[VOLT_READ_CFG_DEV_CHANNEL]]
+        :param channel: Internal channel number
+
+        :return: Actual voltage value (in Volts, not milliVolts)
+        """
+        voltage = self._readRegister(channel, voltageType) * VOLTAGE_LSB_MAP[voltageType]
+        self._voltage_arrays[voltageType][channel] = voltage
+
+        # Hand back the local rather than re-reading the stored value
+        return voltage
 
-    @micropython.native
     def readChannelShuntVoltage(self, channel: int) -> float:
         """
         Reads the shunt voltage for the given channel
@@ -381,19 +450,77 @@ class INA3221:
         """
         return self._readVoltage(channel, SHUNT_VOLTAGE)
 
+    @micropython.native
+    def readAllShuntVoltages(self, device_id: int) -> memoryview:
+        """
+        Reads the shunt voltages of all three channels on a device. Cheaper than calling `readChannelShuntVoltage()`
+        for each channel, as the decode and storage is done for all channels at once.
+
+        :param device_id: ID of the device to read
+
+        :return: The device's channel voltages (in Volts), a view of the stored shunt voltages
+        """
+        addr = self.getDeviceAddr(device_id)
+        views = self._batch_views
+        readfrom_mem_into = self._i2c_readmem
+        for i in range(3):
+            readfrom_mem_into(addr, (i * 2) + SHUNT_VOLTAGE, views[i])
+
+        raw = self._batch_raw
+        _decodeVoltageRegisters(self._batch_buf, raw, 3)
+
+        shunt_voltages = self._shunt_voltages
+        first_channel = device_id * 3
+        for i in range(3):
+            shunt_voltages[first_channel + i] = raw[i] * DEVICE_SHUNT_LSB
+
+        return self._shunt_views[device_id]
+
+    @micropython.native
+    def readAllDeviceVoltages(self, device_id: int) -> memoryview:
+        """
+        Reads the shunt and bus voltages of all three channels on a device, all six registers are decoded in one go
+
+        :param device_id: ID of the device to read
+
+        :return: Voltages (in Volts) in register order: (ch1 shunt, ch1 bus, ch2 shunt, ch2 bus, ch3 shunt, ch3 bus).
+                 A view of storage kept per device, overwritten on the next call for the same device. The stored
+                 channel voltages are updated too.
+        """
+        addr = self.getDeviceAddr(device_id)
+        views = self._batch_views
+        readfrom_mem_into = self._i2c_readmem
+        for i in range(6):
+            readfrom_mem_into(addr, i + 1, views[i])
+
+        raw = self._batch_raw
+        _decodeVoltageRegisters(self._batch_buf, raw, 6)
+
+        voltages = self._device_voltages
+        shunt_voltages = self._shunt_voltages
+        bus_voltages = self._bus_voltages
+        channel = device_id * 3
+        first = device_id * 6
+        for i in range(0, 6, 2):
+            shunt_voltages[channel] = voltages[first + i] = raw[i] * DEVICE_SHUNT_LSB
+            bus_voltages[channel] = voltages[first + i + 1] = raw[i + 1] * DEVICE_BUS_LSB
+            channel += 1
+
+        return self._device_voltage_views[device_id]
+
     @micropython.native
     def readChannelCurrent(self, channel: int) -> float:
         """
-        Reads the shunt voltage for a channel and converts it to current in Amperes
+        Reads the shunt voltage for a channel and converts it to current in Amperes. The raw register value is scaled
+        straight to Amperes, so the channel's stored voltage isn't updated.
 
         :param channel: Global channel ID
 
         :return: The current for the channel, in Amperes
         """
-        return self.readChannelShuntVoltage(channel) \
-               / self._voltageShuntValues[self._volt_read_cfg[VOLT_READ_CFG_DEV_CHANNEL]]
+        raw = self._readRegister(channel, SHUNT_VOLTAGE)
+        return raw * self._current_scales[channel]
 
-    @micropython.native
     def readChannelBusVoltage(self, channel: int) -> float:
         """
         Reads the bus voltage from the given channel
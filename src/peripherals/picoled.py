@@ -11,6 +11,7 @@ class PicoLed:
     def __init__(self, on_by_default = False):
         self._led = Pin(25, mode=Pin.OUT, value=on_by_default)
         self._blink_timer = Timer(mode=Timer.PERIODIC)
+        self._blink_period = 0  # Period of the active blink, 0 when not blinking
 
     def _INTHNDLR_boardLedCycle(self, _):
         self._led.value(not self._led.value())
@@ -21,6 +22,7 @@ class PicoLed:
 
         """
         self._blink_timer.deinit()
+        self._blink_period = 0
         self._led.on()
 
     def off(self):
@@ -29,7 +31,8 @@ class PicoLed:
 
         """
         self._blink_timer.deinit()
-        self._led.on()
+        self._blink_period = 0
+        self._led.off()
 
 
     def blink(self, period: int):
@@ -38,4 +41,8 @@ class PicoLed:
 
         :param period: Period in milliseconds
         """
+        if period == self._blink_period:
+            return  # Already blinking at this rate
+
         self._blink_timer.init(period=period, callback=self._INTHNDLR_boardLedCycle)
+        self._blink_period = period
@@ -0,0 +1,80 @@
+"""
+ws2812.py
+
+PIO-driven WS2812/SK6812 output for the RP2040. The bit timing is generated by a PIO state machine rather than the
+CPU bit-banging it with interrupts disabled (which is what the stock `NeoPixel.write()` does on the RP2040), and the
+buffer is fed to the state machine by DMA, so every string refreshes in parallel while the CPU carries on.
+
+Copyright (C) 2022 Nick Whalen (purplxed@projectneutron.com)
+"""
+import rp2
+from machine import Pin
+from micropython import const
+from neopixel import NeoPixel
+from time import sleep_us, ticks_add, ticks_diff, ticks_us
+
+PIO_STATE_MACHINE_COUNT = const(8)  # 2 PIO blocks with 4 state machines each
+# Each bit is 10 PIO cycles at 800kHz
+PIO_FREQ = const(8_000_000)
+BYTE_US = const(10)  # 8 bits at 1.25us each
+# DREQ of PIO0 SM0's TX FIFO is 0, PIO1 SM0's is 8, so state machines 4-7 are 4 further along than their ID
+PIO1_TX_DREQ_OFFSET = const(4)
+# Strings latch after the line is held low for a while (SK6812 needs >80us), this also covers the FIFO draining
+# after the DMA transfer has finished
+LATCH_US = const(300)
+
+
+@rp2.asm_pio(sideset_init=rp2.PIO.OUT_LOW, out_shiftdir=rp2.PIO.SHIFT_LEFT, autopull=True, pull_thresh=8)
+def _ws2812():
+    # Cycles spent in each phase of a bit: T1 high, T2 high for a 1 (low for a 0), T3 low
+    T1 = 2
+    T2 = 5
+    T3 = 3
+    wrap_target()
+    label("bitloop")
+    out(x, 1)               .side(0)    [T3 - 1]
+    jmp(not_x, "do_zero")   .side(1)    [T1 - 1]
+    jmp("bitloop")          .side(1)    [T2 - 1]
+    label("do_zero")
+    nop()                   .side(0)    [T2 - 1]
+    wrap()
+
+
+class PioNeoPixel(NeoPixel):
+    """
+    Drop-in replacement for `NeoPixel` that clocks the buffer out through a PIO state machine. Only
+    `PIO_STATE_MACHINE_COUNT` of these can exist at once, each needs its own state machine and DMA channel.
+
+    """
+    def __init__(self, state_machine: int, pin: Pin, n: int, bpp: int = 3):
+        """
+        :param state_machine: ID of the state machine to use (0-7), must not be in use by anything else
+        :param pin: Output pin for the string
+        :param n: Number of LEDs on the string
+        :param bpp: Bytes per pixel, 3 for RGB 4 for RGBW
+        """
+        super().__init__(pin, n, bpp=bpp)
+        self._sm = rp2.StateMachine(state_machine, _ws2812, freq=PIO_FREQ, sideset_base=pin)
+        self._sm.active(1)
+        self._dma = rp2.DMA()
+        self._dma_ctrl = self._dma.pack_ctrl(
+            size=0, inc_write=False,
+            treq_sel=state_machine if state_machine < 4 else state_machine + PIO1_TX_DREQ_OFFSET)
+        self._latched_at = ticks_us()
+
+    def write(self):
+        """
+        Starts a DMA transfer of the buffer to the string and returns without waiting for it. The DMA does byte
+        writes to the TX FIFO, which land in every byte of the FIFO word, so the PIO shifting out the top 8 bits sees
+        each byte once. Pixels set while the transfer is still running (`BYTE_US` per byte) may make it into this
+        frame, the next `write()` waits for this frame to be clocked out and latched before starting.
+
+        """
+        remaining = ticks_diff(self._latched_at, ticks_us())
+        if remaining > 0:
+            sleep_us(remaining)
+        while self._dma.active():
+            pass
+
+        self._dma.config(read=self.buf, write=self._sm, count=len(self.buf), ctrl=self._dma_ctrl, trigger=True)
+        self._latched_at = ticks_add(ticks_us(), len(self.buf) * BYTE_US + LATCH_US)
@@ -9,11 +9,20 @@ The Steinhart-Hart equations were pulled from
 https://www.allaboutcircuits.com/industry-articles/how-to-obtain-the-temperature-value-from-a-thermistor-measurement/
 """
 import micropython
+from array import array
 from math import log, pow
+from micropython import const
 
 TEMPERATURE_C = 0
 TEMPERATURE_F = 1
 
+ZERO_C_IN_K = 273.15        # 0C is 273.15K
+ZERO_K_IN_F = -459.67
+K_TO_F_SCALE = 1.8          # 9/5
+
+KELVIN_LUT_SIZE = const(512)    # Approximate number of interpolation intervals in a Kelvin LUT
+KELVIN_LUT_SCALE = 0.01         # LUT entries are in centi-Kelvin
+
 # https://www.alphacool.com/download/kOhm_Sensor_Table_Alphacool.pdf
 ALPHACOOL_SHH_COEFS = (0.0008659402243206102, 0.00025547032882431244, 1.7292289771201514e-07)
 ALPHACOOL_BETA_VALUE = 3435
@@ -37,10 +46,39 @@ def computeTemperature(adc_voltage: float, shh_A: float, shh_B: float, shh_C: fl
     :param units: TEMPERATURE_C or TEMPERATURE_F
     :return:
     """
+    kelvin = computeKelvin(adc_voltage, shh_A, shh_B, shh_C, adc_vref, pair_resistance)
+    # Conversions inlined, the call would cost more than the arithmetic
     if units == TEMPERATURE_F:
-        return kelvinToFahrenheit(computeKelvin(adc_voltage, shh_A, shh_B, shh_C, adc_vref, pair_resistance))
+        return (kelvin * K_TO_F_SCALE) + ZERO_K_IN_F
     else:
-        return kelvinToCelsius(computeKelvin(adc_voltage, shh_A, shh_B, shh_C, adc_vref, pair_resistance))
+        return kelvin - ZERO_C_IN_K
+
+
+def makeTemperatureReader(shh_A: float, shh_B: float, shh_C: float, adc_vref: float = 3.31175,
+                          pair_resistance=10_000, units: int = TEMPERATURE_C):
+    """
+    Builds a `computeTemperature` specialized for one sensor, with the coefficients, divider values and units baked in
+    so each reading is a single-argument call. Build it once per sensor, at init.
+
+    :param shh_A: Steinhart-Hart coefficient A
+    :param shh_B: Steinhart-Hart coefficient B
+    :param shh_C: Steinhart-Hart coefficient C
+    :param adc_vref: The ADC reference voltage
+    :param pair_resistance: The resistance of the other resistor (not the sensor) in the voltage divider
+                       (10kOhms for 10K thermistors)
+    :param units: TEMPERATURE_C or TEMPERATURE_F
+
+    :return: Function taking the voltage measured by the ADC across the thermistor, and returning the temperature
+    """
+    scale = K_TO_F_SCALE if units == TEMPERATURE_F else 1.0
+    offset = ZERO_K_IN_F if units == TEMPERATURE_F else -ZERO_C_IN_K
+
+    @micropython.native
+    def readTemperature(adc_voltage: float) -> float:
+        L = log((adc_voltage * pair_resistance) / (adc_vref - adc_voltage))
+        return (scale / (shh_A + shh_B * L + shh_C * L * L * L)) + offset
+
+    return readTemperature
 
 @micropython.native
 def computeKelvin(adc_voltage: float, shh_A: float, shh_B: float, shh_C: float, adc_vref: float = 3.31175,
@@ -60,8 +98,78 @@ def computeKelvin(adc_voltage: float, shh_A: float, shh_B: float, shh_C: float,
     :return: Temperature in Kelvin
     """
     # Hello Steinhart-Hart
-    return (1 / (shh_A + shh_B * log(computeResistance(adc_voltage, adc_vref, pair_resistance)) + shh_C *
-                 pow(log(computeResistance(adc_voltage, adc_vref, pair_resistance)), 3)))
+    L = log(computeResistance(adc_voltage, adc_vref, pair_resistance))
+    return 1 / (shh_A + shh_B * L + shh_C * L * L * L)
+
+def buildKelvinLut(adc_lsb: float, shh_A: float, shh_B: float, shh_C: float, adc_vref: float = 3.31175,
+                   pair_resistance=10_000) -> tuple:
+    """
+    Builds a lookup table for `computeKelvinFast`, mapping raw ADC counts straight to temperature so the Steinhart-Hart
+    equation (soft-float log and divides on the Pico) is only evaluated here. Build it once per sensor, at init.
+
+    :param adc_lsb: Volts per ADC count, for the ADC's configured full-scale range
+    :param shh_A: Steinhart-Hart coefficient A
+    :param shh_B: Steinhart-Hart coefficient B
+    :param shh_C: Steinhart-Hart coefficient C
+    :param adc_vref: The ADC reference voltage
+    :param pair_resistance: The resistance of the other resistor (not the sensor) in the voltage divider
+                       (10kOhms for 10K thermistors)
+
+    :return: (LUT, index shift, highest valid ADC count), pass as-is to `computeKelvinFast`
+    """
+    # Counts at or above the reference voltage mean an open sensor, there's no temperature for them
+    max_count = int(adc_vref / adc_lsb) - 1
+    shift = 0
+    while (max_count >> shift) >= KELVIN_LUT_SIZE:
+        shift += 1
+
+    lut = array("H", bytes(2 * ((max_count >> shift) + 2)))
+    for idx in range(0, len(lut)):
+        count = min(max(idx << shift, 1), max_count)
+        try:
+            kelvin = computeKelvin(count * adc_lsb, shh_A, shh_B, shh_C, adc_vref, pair_resistance)
+        except (ValueError, ZeroDivisionError):
+            kelvin = 0.0
+        # The extreme ends (shorted/open sensor) fall outside what the table holds, clamp them
+        lut[idx] = min(max(int(kelvin / KELVIN_LUT_SCALE), 0), 0xFFFF)
+
+    return lut, shift, max_count
+
+
+@micropython.viper
+def _interpolateLut(lut: ptr16, count: int, shift: int) -> int:
+    """
+    Linearly interpolates between the two LUT entries on either side of `count`
+
+    :param lut: Table with an entry every `1 << shift` counts
+    :param count: Input value, must be within the table
+    :param shift: log2 of the input step between table entries
+
+    :return: Interpolated table value
+    """
+    idx = count >> shift
+    frac = count - (idx << shift)
+    low = int(lut[idx])
+    return low + (((int(lut[idx + 1]) - low) * frac) >> shift)
+
+
+@micropython.native
+def computeKelvinFast(kelvin_lut: tuple, adc_count: int) -> float:
+    """
+    Computes temperature in Kelvin from a raw ADC count using a LUT from `buildKelvinLut`. Accurate to a few hundredths
+    of a degree across the sensor's usable range, at a fraction of the cost of `computeKelvin`.
+
+    :param kelvin_lut: The LUT tuple returned by `buildKelvinLut`
+    :param adc_count: Raw ADC count (e.g. `_ADS1115Device.readValue()`)
+
+    :return: Temperature in Kelvin
+    """
+    lut, shift, max_count = kelvin_lut
+    if adc_count < 0:
+        adc_count = 0
+    elif adc_count > max_count:
+        adc_count = max_count
+    return _interpolateLut(lut, adc_count, shift) * KELVIN_LUT_SCALE
 
 @micropython.native
 def computeBetaTemperature(adc_voltage, beta_val, adc_vref = 3.31175, divider_resist = 10_000) -> float:
@@ -76,9 +184,8 @@ def computeBetaTemperature(adc_voltage, beta_val, adc_vref = 3.31175, divider_re
     :return: Celsius
     """
     return (1/((1/298.15)+(1/beta_val)*
-               (log(computeResistance(adc_voltage, adc_vref, divider_resist)/10_000))) - 273.15)
+               (log(computeResistance(adc_voltage, adc_vref, divider_resist)/10_000))) - ZERO_C_IN_K)
 
-@micropython.native
 def kelvinToFahrenheit(k_val: float) -> float:
     """
     Converts a Kelvin value to a Fahrenheit value
@@ -87,9 +194,8 @@ def kelvinToFahrenheit(k_val: float) -> float:
 
     :return: Fahrenheit value
     """
-    return (k_val * (9/5))-459.67
+    return (k_val * K_TO_F_SCALE) + ZERO_K_IN_F
 
-@micropython.native
 def kelvinToCelsius(k_val: float) -> float:
     """
     Converts a Kelvin value to a Celsius value
@@ -98,9 +204,8 @@ def kelvinToCelsius(k_val: float) -> float:
 
     :return: Celsius value
     """
-    return k_val - 273.15 # 0C is 273.15K
+    return k_val - ZERO_C_IN_K
 
-@micropython.native
 def celsiusToKelvin(c_val: float) -> float:
     """
    Converts a Celsius value to a Kelvin value
@@ -109,7 +214,7 @@ def celsiusToKelvin(c_val: float) -> float:
 
    :return: Kelvin value
    """
-    return 273.15 + c_val
+    return ZERO_C_IN_K + c_val
 
 @micropython.native
 def computeSHHCoefficients(low_R, mid_R, high_R, high_Temp = 150, mid_Temp = 25, low_Temp = -40) -> tuple:
@@ -0,0 +1,104 @@
+"""
+Host-side tests for ads1115.py, run with `python -m unittest discover -s tests`. The MicroPython-only modules the driver
+imports are replaced with minimal stand-ins, and the driver is compiled with postponed annotations, as CPython can't
+evaluate annotations like `bytearray[2]`.
+"""
+import __future__
+import sys
+import time
+import types
+import unittest
+from pathlib import Path
+
+micropython = types.ModuleType("micropython")
+micropython.const = lambda value: value
+micropython.native = micropython.viper = lambda func: func
+machine = types.ModuleType("machine")
+machine.I2C = object
+sys.modules.setdefault("micropython", micropython)
+sys.modules.setdefault("machine", machine)
+time.sleep_us = getattr(time, "sleep_us", lambda us: None)
+time.ticks_us = getattr(time, "ticks_us", lambda: time.perf_counter_ns() // 1000)
+time.ticks_diff = getattr(time, "ticks_diff", lambda end, start: end - start)
+
+ADS1115_PATH = Path(__file__).resolve().parent.parent / "src" / "peripherals" / "ads1115.py"
+ads1115 = types.ModuleType("ads1115")
+exec(compile(ADS1115_PATH.read_text(), str(ADS1115_PATH), "exec", __future__.annotations.compiler_flag, True),
+     ads1115.__dict__)
+
+
+class FakeADS1115:
+    """
+    Just enough of an ADS1115 on an I2C bus: a register pointer, and a config register whose OS bit reads 0 while a
+    single-shot conversion is running and 1 once it's done
+    """
+    def __init__(self, busy_polls: int = 2):
+        self.pointer = ads1115.ADDR_CONFIG_REG
+        self.config = bytearray((0x85, 0x83))
+        self.busy_polls = busy_polls
+        self.busy_for = 0
+        self.os_polls = 0
+
+    def _readConfig(self, buf):
+        os_bit = 0x00 if self.busy_for else 0x80
+        buf[0] = (self.config[0] & 0x7F) | os_bit
+        if len(buf) > 1:
+            buf[1] = self.config[1]
+
+    def writeto_mem(self, addr, reg, data):
+        self.pointer = reg
+        if reg == ads1115.ADDR_CONFIG_REG:
+            self.config[:] = data
+            if data[0] & 0x80 and data[0] & 0x01:
+                self.busy_for = self.busy_polls
+
+    def readfrom_into(self, addr, buf):
+        if self.pointer == ads1115.ADDR_CONFIG_REG:
+            self._readConfig(buf)
+        else:
+            buf[:] = bytes(len(buf))
+
+    def readfrom_mem_into(self, addr, reg, buf):
+        self.pointer = reg
+        if reg == ads1115.ADDR_CONFIG_REG:
+            self._readConfig(buf)
+            if len(buf) == 1:
+                self.os_polls += 1
+                self.busy_for = max(self.busy_for - 1, 0)
+        else:
+            buf[:] = bytes(len(buf))
+
+
+class WriteConfigTest(unittest.TestCase):
+    def testSingleShotWaitsForConversion(self):
+        bus = FakeADS1115(busy_polls=2)
+        config = (ads1115.CFG_OS_STAT_WRITE_SINGLE | ads1115.CFG_MUX_AIN0_GND | ads1115.CFG_PGA_FSR_4_096 |
+                  ads1115.CFG_OP_MODE_SNGL | ads1115.CFG_DATA_RT_860SPS | ads1115.CFG_COMP_QUE_DISABLE)
+        ads = ads1115.ADS1115(bus, device_defaults=config)
+
+        ads.addDevice(0x48, "test")
+
+        # Two polls while busy, then the one that sees it idle
+        self.assertEqual(bus.os_polls, 3)
+        self.assertEqual(bus.busy_for, 0)
+
+    def testSingleShotIdleConfigIsAccepted(self):
+        bus = FakeADS1115()
+        config = ads1115.CFG_MUX_AIN1_GND | ads1115.CFG_OP_MODE_SNGL | ads1115.CFG_COMP_QUE_DISABLE
+        ads = ads1115.ADS1115(bus, device_defaults=config)
+
+        ads.addDevice(0x48, "test")
+
+        self.assertEqual(bus.os_polls, 1)
+
+    def testMismatchedConfigRaises(self):
+        bus = FakeADS1115()
+        bus.readfrom_into = lambda addr, buf: buf.__setitem__(slice(None), b"\x00\x00")
+        ads = ads1115.ADS1115(bus)
+
+        with self.assertRaises(ads1115.ADSConfigError):
+            ads.addDevice(0x48, "test")
+
+
+if __name__ == "__main__":
+    unittest.main()